@@ -1,17 +1,37 @@
+import io
 import os
 import re
+import hashlib
 import logging # Import the logging module
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from flask.json.provider import JSONProvider
+from jinja2 import Environment
+import orjson
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from pymongo import MongoClient
 from bson import ObjectId
-from bs4 import BeautifulSoup
+from bson.errors import InvalidId
+import lxml.html
 
 # --- Flask App Initialization ---
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, which encodes several times faster than
+    the stdlib json used by Flask's default provider."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # --- NEW: Logging Configuration ---
@@ -19,24 +39,132 @@ CORS(app)
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- HTTP Session Configuration ---
+# A shared session reuses keep-alive connections to JIRA/Gemini instead of
+# paying a fresh TCP+TLS handshake on every call.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                      max_retries=Retry(total=2, backoff_factor=0.2)))
+
+# Shared header dicts, built once instead of per request.
+ACCEPT_JSON_HEADERS = {"Accept": "application/json"}
+POST_JSON_HEADERS = {"Content-Type": "application/json"}
+SEARCH_JSON_HEADERS = {"Accept": "application/json", "Content-Type": "application/json"}
+
 # --- Database Configuration ---
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/release_notes")
 client = MongoClient(MONGO_URI)
 db = client.get_database()
 app.logger.info("Successfully connected to MongoDB.")
 
+# TTL indexes let MongoDB expire cached JIRA payloads and AI summaries after an
+# hour, so regenerating a release skips the JIRA/Gemini round-trips on repeats.
+CACHE_TTL_SECONDS = 3600
+db.jira_cache.create_index('fetched_at', expireAfterSeconds=CACHE_TTL_SECONDS)
+db.ai_cache.create_index('fetched_at', expireAfterSeconds=CACHE_TTL_SECONDS)
+
+# A descending index on created_at lets GET /api/releases stream results in
+# index order instead of sorting the whole collection in memory each request.
+db.releases.create_index([('created_at', -1)])
+
+# Generation runs as a background job so the HTTP worker is not held for the
+# tens of seconds of JIRA/Gemini traffic. Job status lives in MongoDB (not in
+# process memory) so any gunicorn worker can answer the poll endpoint; old job
+# records expire after a day.
+db.generation_jobs.create_index('created_at', expireAfterSeconds=86400)
+GENERATION_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+# If the worker holding the executor dies mid-job (deploy, OOM), the job
+# document would stay 'started' until the TTL removes it. The status endpoint
+# treats jobs older than the gunicorn timeout (see Dockerfile) as failed.
+GENERATION_JOB_TIMEOUT = 120
+
+# Settings change rarely but are read on every settings GET and every
+# generation, so keep the document in memory for a short while. The POST
+# invalidation only reaches the worker that handled it, so the TTL bounds how
+# long the other gunicorn workers can serve stale credentials.
+SETTINGS_CACHE_TTL = 5
+_settings_cache = {'ts': 0.0, 'data': None}
+
+def get_settings():
+    if _settings_cache['data'] is None or time.monotonic() - _settings_cache['ts'] >= SETTINGS_CACHE_TTL:
+        _settings_cache['data'] = db.settings.find_one({'_id': 'global_settings'}) or {}
+        _settings_cache['ts'] = time.monotonic()
+    return _settings_cache['data']
+
+# The release list rarely changes between requests, so serve it from memory
+# for a few seconds. Writes reset the timestamp; worst-case staleness in other
+# workers is bounded by the TTL.
+RELEASES_CACHE_TTL = 5
+_releases_cache = {'ts': 0.0, 'body': None}
+
+def _invalidate_releases_cache():
+    _releases_cache['ts'] = 0.0
+
+# --- Precompiled Regexes ---
+# Compiled once at import so the request hot path skips re's cache lookup.
+SPLIT_RE = re.compile(r'[,\s\n]+')
+VERSION_RE = re.compile(r'(\d+\.\d+\.\d+)')
+ITEM_RE = re.compile(r'===\s*ITEM\s+(\d+)\s*===')
+
+# --- Markdown Template ---
+# Compiled once at import; rendering through Jinja's optimized concat path
+# replaces the per-ticket f-string and append churn in generate_final_markdown.
+MARKDOWN_TEMPLATE_SRC = """\
+{% if mongo_intro %}
+{{ mongo_intro }}
+
+---
+{% endif %}
+{% if release_highlights %}
+## Release Highlights
+
+This release provides the following features and improvements:
+
+{{ release_highlights }}
+
+---
+{% endif %}
+{% if upstream_section %}
+{{ upstream_section }}
+
+---
+{% endif %}
+{{ title_line }}
+*Released on: {{ release_date }}*
+---
+{% for section_title, section_tickets in sections %}
+{{ section_title }}
+{% for ticket in section_tickets %}
+- [{{ ticket.key }}](https://{{ domain }}/browse/{{ ticket.key }}): {{ ticket.releaseNoteSummary }}
+{% endfor %}
+
+{% endfor %}"""
+MARKDOWN_TEMPLATE = Environment(trim_blocks=True, lstrip_blocks=True,
+                                autoescape=False).from_string(MARKDOWN_TEMPLATE_SRC)
+
+# Ticket categorization tables, hoisted so they are not rebuilt per call.
+ISSUE_TYPE_MAP = {'Story': 'features', 'New Feature': 'features', 'Improvement': 'features', 'Epic': 'features', 'Bug': 'fixes', 'Defect': 'fixes', 'Task': 'maintenance', 'Sub-task': 'maintenance', 'Chore': 'maintenance', 'Technical Debt': 'maintenance'}
+SECTION_ORDER = [("features", "## ✨ New Features & Enhancements"),
+                 ("fixes", "## 🐛 Bug Fixes"),
+                 ("maintenance", "## 🔧 Technical & Maintenance")]
+
 # --- Helper Functions ---
 def parse_jira_description(description_field):
     if not isinstance(description_field, dict) or "content" not in description_field:
         return ""
+    # Walk the ADF tree with an explicit stack: no per-node call overhead and no
+    # RecursionError on deeply nested descriptions. Children are pushed reversed
+    # so text still comes out in document order.
     text_content = []
-    def recurse(nodes):
-        for node in nodes:
-            if node.get("type") == "text" and "text" in node:
-                text_content.append(node["text"])
-            if "content" in node and isinstance(node["content"], list):
-                recurse(node["content"])
-    recurse(description_field["content"])
+    append = text_content.append
+    stack = list(reversed(description_field["content"]))
+    while stack:
+        node = stack.pop()
+        if node.get("type") == "text" and "text" in node:
+            append(node["text"])
+        children = node.get("content")
+        if isinstance(children, list):
+            stack.extend(reversed(children))
     return " ".join(text_content)
 
 # --- API Routes ---
@@ -47,11 +175,12 @@ def settings():
     if request.method == 'POST':
         data = request.get_json()
         db.settings.update_one({'_id': 'global_settings'}, {'$set': data}, upsert=True)
+        _settings_cache['data'] = None
         app.logger.info("Settings saved successfully.")
         return jsonify({"message": "Settings saved successfully."})
-    settings_data = db.settings.find_one({'_id': 'global_settings'})
+    settings_data = get_settings()
     app.logger.info("Fetched settings successfully.")
-    return jsonify(settings_data or {})
+    return jsonify(settings_data)
 
 @app.route('/api/releases', methods=['GET', 'POST'])
 def releases():
@@ -60,18 +189,46 @@ def releases():
         data = request.get_json()
         data['created_at'] = datetime.utcnow()
         result = db.releases.insert_one(data)
+        _invalidate_releases_cache()
         app.logger.info(f"New release created with ID: {result.inserted_id}")
         return jsonify({"message": "Release created.", "id": str(result.inserted_id)}), 201
-    all_releases = list(db.releases.find().sort('created_at', -1))
-    for release in all_releases:
-        release['_id'] = str(release['_id'])
-    app.logger.info(f"Fetched {len(all_releases)} releases from the database.")
-    return jsonify(all_releases)
+    if _releases_cache['body'] is not None and time.monotonic() - _releases_cache['ts'] < RELEASES_CACHE_TTL:
+        app.logger.info("Serving releases from the in-process cache.")
+        return Response(_releases_cache['body'], mimetype='application/json')
+    # The list view never shows the generated markdown, so leave the largest
+    # field on the server instead of shipping and JSON-encoding it. Streaming
+    # straight off the cursor keeps peak memory flat however large the
+    # collection grows, instead of materializing every document first.
+    cursor = db.releases.find({}, {'generatedMarkdown': 0}).sort('created_at', -1).batch_size(200)
+
+    def generate():
+        chunks = [b'[']
+        yield b'['
+        separator = b''
+        for release in cursor:
+            release['_id'] = str(release['_id'])
+            chunk = separator + orjson.dumps(release, default=str)
+            chunks.append(chunk)
+            yield chunk
+            separator = b','
+        chunks.append(b']')
+        yield b']'
+        # Only a fully streamed response is a complete body, so populate the
+        # cache here rather than up front.
+        _releases_cache['body'] = b''.join(chunks)
+        _releases_cache['ts'] = time.monotonic()
+        app.logger.info("Finished streaming releases from the database.")
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/api/releases/<release_id>', methods=['GET', 'PUT', 'DELETE'])
 def release_detail(release_id):
     app.logger.info(f"Request for /api/releases/{release_id}, method: {request.method}")
-    oid = ObjectId(release_id)
+    try:
+        oid = ObjectId(release_id)
+    except (InvalidId, TypeError):
+        app.logger.warning(f"Invalid release id: {release_id}")
+        return jsonify({"error": "Invalid release id"}), 400
     if request.method == 'GET':
         release = db.releases.find_one({'_id': oid})
         if release:
@@ -83,62 +240,108 @@ def release_detail(release_id):
     if request.method == 'PUT':
         data = request.get_json()
         db.releases.update_one({'_id': oid}, {'$set': data})
+        _invalidate_releases_cache()
         app.logger.info(f"Release {release_id} updated successfully.")
         return jsonify({"message": "Release updated successfully."})
     if request.method == 'DELETE':
         db.releases.delete_one({'_id': oid})
+        _invalidate_releases_cache()
         app.logger.info(f"Release {release_id} deleted successfully.")
         return jsonify({"message": "Release deleted successfully."})
 
 @app.route('/api/releases/<release_id>/generate', methods=['POST'])
 def generate_release_notes(release_id):
-    app.logger.info(f"Starting release notes generation for ID: {release_id}")
-    settings = db.settings.find_one({'_id': 'global_settings'}) or {}
-    release = db.releases.find_one({'_id': ObjectId(release_id)})
+    app.logger.info(f"Queueing release notes generation for ID: {release_id}")
+    try:
+        oid = ObjectId(release_id)
+    except (InvalidId, TypeError):
+        app.logger.warning(f"Invalid release id: {release_id}")
+        return jsonify({"error": "Invalid release id"}), 400
+    settings = get_settings()
+    release = db.releases.find_one({'_id': oid},
+                                   {'upstreamUrls': 1, 'version': 1, 'releaseHighlights': 1,
+                                    'upstreamBugUrls': 1, 'jiraTickets': 1, 'codename': 1})
     if not release:
         app.logger.error(f"Generation failed: Release {release_id} not found.")
         return jsonify({"error": "Release not found"}), 404
 
-    domain, email, token, gemini_token = settings.get('jiraUrl'), settings.get('jiraEmail'), settings.get('jiraToken'), settings.get('geminiToken')
-    if not all([domain, email, token]):
+    if not all([settings.get('jiraUrl'), settings.get('jiraEmail'), settings.get('jiraToken')]):
         app.logger.error("Generation failed: JIRA settings are incomplete.")
         return jsonify({"error": "JIRA settings are incomplete. Please configure them on the Settings page."}), 400
 
-    mongo_intro = generate_mongo_intro(release.get('upstreamUrls', ''), release.get('version', ''))
-    release_highlights = release.get('releaseHighlights', '')
-    upstream_bug_urls = release.get('upstreamBugUrls', '')
-    upstream_section = process_upstream_bugs(upstream_bug_urls, release.get('upstreamUrls', ''), gemini_token)
-
-    ticket_keys = sorted(list(set(filter(None, re.split(r'[,\s\n]+', release.get('jiraTickets', ''))))))
-    tickets_with_summaries = []
-    app.logger.info(f"Processing {len(ticket_keys)} JIRA tickets.")
-    for key in ticket_keys:
-        ticket_info = fetch_jira_ticket(domain, email, token, key.upper())
-        if ticket_info:
-            title = ticket_info.get("fields", {}).get("summary", "No title")
-            description_text = parse_jira_description(ticket_info.get("fields", {}).get("description"))
-            summary = get_summary_from_ai(title, description_text, gemini_token, is_upstream=False)
-            ticket_info['releaseNoteSummary'] = summary
-            tickets_with_summaries.append(ticket_info)
-
-    if not tickets_with_summaries and ticket_keys:
-        app.logger.warning("Could not fetch data for any provided JIRA tickets.")
-        return jsonify({"error": "Could not fetch data for any JIRA tickets."}), 400
+    job = {'release_id': release_id, 'status': 'queued', 'created_at': datetime.utcnow()}
+    job_id = db.generation_jobs.insert_one(job).inserted_id
+    GENERATION_EXECUTOR.submit(_do_generate, job_id, oid, release, settings)
+    app.logger.info(f"Queued generation job {job_id} for release {release_id}.")
+    return jsonify({"job_id": str(job_id), "status": "queued"}), 202
 
-    markdown_output = generate_final_markdown(mongo_intro, release_highlights, upstream_section, tickets_with_summaries, release.get('version'), release.get('codename'), domain)
-    db.releases.update_one({'_id': ObjectId(release_id)}, {'$set': {'generatedMarkdown': markdown_output}})
-    app.logger.info(f"Successfully generated and saved markdown for release {release_id}.")
-    return jsonify({"markdown": markdown_output})
+@app.route('/api/releases/<release_id>/generate/status', methods=['GET'])
+def generate_release_notes_status(release_id):
+    job = db.generation_jobs.find_one({'release_id': release_id}, sort=[('created_at', -1)])
+    if not job:
+        app.logger.warning(f"No generation job found for release {release_id}.")
+        return jsonify({"error": "No generation job found for this release"}), 404
+    if job['status'] in ('queued', 'started') and datetime.utcnow() - job['created_at'] > timedelta(seconds=GENERATION_JOB_TIMEOUT):
+        app.logger.warning(f"Generation job {job['_id']} for release {release_id} timed out; marking it failed.")
+        db.generation_jobs.update_one({'_id': job['_id']},
+                                      {'$set': {'status': 'failed', 'error': "Generation timed out."}})
+        job['status'] = 'failed'
+        job['error'] = "Generation timed out."
+    job['_id'] = str(job['_id'])
+    return jsonify(job)
 
 # --- Business Logic Functions ---
 
+def _do_generate(job_id, oid, release, settings):
+    """Background worker for generate_release_notes.
+
+    Runs the JIRA/Gemini/scraping pipeline, writes the markdown back to the
+    release, and records progress on the generation_jobs document polled by
+    the status endpoint.
+    """
+    db.generation_jobs.update_one({'_id': job_id}, {'$set': {'status': 'started'}})
+    try:
+        domain, email, token, gemini_token = settings.get('jiraUrl'), settings.get('jiraEmail'), settings.get('jiraToken'), settings.get('geminiToken')
+        mongo_intro = generate_mongo_intro(release.get('upstreamUrls', ''), release.get('version', ''))
+        release_highlights = release.get('releaseHighlights', '')
+        upstream_bug_urls = release.get('upstreamBugUrls', '')
+        upstream_section = process_upstream_bugs(upstream_bug_urls, release.get('upstreamUrls', ''), gemini_token)
+
+        ticket_keys = sorted(list(set(filter(None, SPLIT_RE.split(release.get('jiraTickets', ''))))))
+        app.logger.info(f"Processing {len(ticket_keys)} JIRA tickets.")
+        tickets_with_summaries = fetch_jira_tickets_bulk(domain, email, token,
+                                                         [key.upper() for key in ticket_keys])
+
+        summary_items = [(ticket_info.get("fields", {}).get("summary", "No title"),
+                          parse_jira_description(ticket_info.get("fields", {}).get("description")),
+                          False)
+                         for ticket_info in tickets_with_summaries]
+        summaries = get_summaries_from_ai(summary_items, gemini_token)
+        for ticket_info, summary in zip(tickets_with_summaries, summaries):
+            ticket_info['releaseNoteSummary'] = summary
+
+        if not tickets_with_summaries and ticket_keys:
+            app.logger.warning("Could not fetch data for any provided JIRA tickets.")
+            db.generation_jobs.update_one({'_id': job_id},
+                                          {'$set': {'status': 'failed', 'error': "Could not fetch data for any JIRA tickets."}})
+            return
+
+        markdown_output = generate_final_markdown(mongo_intro, release_highlights, upstream_section, tickets_with_summaries, release.get('version'), release.get('codename'), domain)
+        db.releases.update_one({'_id': oid}, {'$set': {'generatedMarkdown': markdown_output}})
+        db.generation_jobs.update_one({'_id': job_id},
+                                      {'$set': {'status': 'finished', 'markdown': markdown_output}})
+        app.logger.info(f"Successfully generated and saved markdown for release {oid}.")
+    except Exception as e:
+        app.logger.exception(f"Generation job {job_id} for release {oid} failed.")
+        db.generation_jobs.update_one({'_id': job_id}, {'$set': {'status': 'failed', 'error': str(e)}})
+
 def generate_mongo_intro(urls_raw, version):
     if not urls_raw or not urls_raw.strip(): return ""
-    urls = list(set(filter(None, re.split(r'[,\s\n]+', urls_raw))))
+    urls = list(set(filter(None, SPLIT_RE.split(urls_raw))))
     if not urls: return ""
     mongo_links, versions = [], []
     for url in urls:
-        match = re.search(r'(\d+\.\d+\.\d+)', url)
+        match = VERSION_RE.search(url)
         if match:
             mongo_version = match.group(1)
             versions.append(mongo_version)
@@ -157,19 +360,82 @@ It supports protocols and drivers of MongoDB Community {' through '.join(sorted(
 """
 
 def fetch_jira_ticket(domain, email, token, key):
+    cached = db.jira_cache.find_one({'_id': f"{domain}:{key}"})
+    if cached:
+        app.logger.info(f"Using cached JIRA ticket: {key}")
+        return cached['payload']
     url = f"https://{domain}/rest/api/3/issue/{key}"
     auth = HTTPBasicAuth(email, token)
     try:
-        response = requests.get(url, headers={"Accept": "application/json"}, auth=auth, timeout=10)
+        response = SESSION.get(url, headers=ACCEPT_JSON_HEADERS, auth=auth, timeout=10)
         response.raise_for_status()
         app.logger.info(f"Successfully fetched JIRA ticket: {key}")
-        return response.json()
+        payload = orjson.loads(response.content)
+        db.jira_cache.update_one({'_id': f"{domain}:{key}"},
+                                 {'$set': {'fetched_at': datetime.utcnow(), 'payload': payload}},
+                                 upsert=True)
+        return payload
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error fetching JIRA ticket {key}: {e}")
         return None
 
+def fetch_jira_tickets_bulk(domain, email, token, keys):
+    """Fetch many JIRA issues with one search request instead of one GET per key.
+
+    Cached issues are served from jira_cache; the rest come back from a single
+    JQL "key in (...)" query. Returns the issues in the order of keys, skipping
+    any that could not be fetched.
+    """
+    tickets = {}
+    missing = []
+    for key in keys:
+        cached = db.jira_cache.find_one({'_id': f"{domain}:{key}"})
+        if cached:
+            tickets[key] = cached['payload']
+        else:
+            missing.append(key)
+    if missing:
+        url = f"https://{domain}/rest/api/3/search"
+        payload = {"jql": f"key in ({','.join(missing)})",
+                   "fields": ["summary", "description", "issuetype"],
+                   "maxResults": len(missing)}
+        auth = HTTPBasicAuth(email, token)
+        try:
+            response = SESSION.post(url, data=orjson.dumps(payload), headers=SEARCH_JSON_HEADERS,
+                                    auth=auth, timeout=20)
+            response.raise_for_status()
+            issues = orjson.loads(response.content).get('issues', [])
+            app.logger.info(f"Fetched {len(issues)} JIRA tickets in one search request.")
+            now = datetime.utcnow()
+            for issue in issues:
+                tickets[issue['key']] = issue
+                db.jira_cache.update_one({'_id': f"{domain}:{issue['key']}"},
+                                         {'$set': {'fetched_at': now, 'payload': issue}},
+                                         upsert=True)
+            # JIRA caps the search page size (100 on Cloud) regardless of the
+            # maxResults we ask for, so a large batch can come back truncated.
+            missing = [key for key in missing if key not in tickets]
+            if missing:
+                app.logger.warning(f"Bulk JIRA search returned {len(issues)} issues; fetching the remaining {len(missing)} tickets individually.")
+        except requests.exceptions.RequestException as e:
+            # A single bad key fails the whole JQL query, so retry the misses
+            # individually rather than losing the entire batch.
+            app.logger.error(f"Bulk JIRA search failed ({e}); falling back to per-ticket fetches.")
+        if missing:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                fetched = executor.map(lambda key: fetch_jira_ticket(domain, email, token, key), missing)
+            for key, issue in zip(missing, fetched):
+                if issue:
+                    tickets[key] = issue
+    return [tickets[key] for key in keys if key in tickets]
+
 def get_summary_from_ai(title, description, gemini_token, is_upstream=False):
     if not description or not description.strip(): return title
+    cache_key = hashlib.blake2b(f"{is_upstream}:{title}:{description}".encode()).hexdigest()
+    cached = db.ai_cache.find_one({'_id': cache_key})
+    if cached:
+        app.logger.info(f"Using cached summary for title: '{title[:30]}...'")
+        return cached['summary']
     prompt_intro = "Generate a concise, user-friendly summary for an upstream bug fix. The summary should be a single, clear sentence explaining the fix from an end-user's perspective." if is_upstream else "Generate a concise, user-friendly summary for a software release note based on the following JIRA ticket details. The summary should be a single, clear sentence explaining the change from an end-user's perspective."
     api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={gemini_token}"
     prompt = f"""{prompt_intro} Do not start with phrases like "This ticket" or "The user can now". Just state the change directly.
@@ -178,93 +444,164 @@ JIRA Description: "{description}"
 Release Note Summary:"""
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
     try:
-        response = requests.post(api_url, json=payload, headers={'Content-Type': 'application/json'}, timeout=20)
+        response = SESSION.post(api_url, data=orjson.dumps(payload), headers=POST_JSON_HEADERS, timeout=20)
         response.raise_for_status()
-        result = response.json()
-        summary = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+        result = orjson.loads(response.content)
+        summary = (((result.get('candidates') or [{}])[0].get('content') or {}).get('parts') or [{}])[0].get('text', '')
         app.logger.info(f"Successfully generated summary for title: '{title[:30]}...'")
-        return summary.strip() if summary else title
+        summary = summary.strip() if summary else title
+        db.ai_cache.update_one({'_id': cache_key},
+                               {'$set': {'fetched_at': datetime.utcnow(), 'summary': summary}},
+                               upsert=True)
+        return summary
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error calling Gemini API for title '{title[:30]}...': {e}")
         return title
 
+def get_summaries_from_ai(items, gemini_token):
+    """Summarize many (title, description, is_upstream) items in one Gemini call.
+
+    Returns a list of summaries in the same order as items. Cached or
+    description-less items never reach the API; the rest are batched into a
+    single delimited prompt so N summaries cost one HTTP round-trip.
+    """
+    summaries = [None] * len(items)
+    pending = []
+    for idx, (title, description, is_upstream) in enumerate(items):
+        if not description or not description.strip():
+            summaries[idx] = title
+            continue
+        cache_key = hashlib.blake2b(f"{is_upstream}:{title}:{description}".encode()).hexdigest()
+        cached = db.ai_cache.find_one({'_id': cache_key})
+        if cached:
+            summaries[idx] = cached['summary']
+        else:
+            pending.append((idx, cache_key))
+    if not pending:
+        return summaries
+
+    sections = []
+    for n, (idx, _) in enumerate(pending, 1):
+        title, description, is_upstream = items[idx]
+        kind = "upstream bug fix" if is_upstream else "JIRA ticket"
+        sections.append(f'=== ITEM {n} ===\nType: {kind}\nTitle: "{title}"\nDescription: "{description}"')
+    prompt = f"""For each item below, generate a concise, user-friendly release note summary: a single, clear sentence explaining the change from an end-user's perspective. Do not start with phrases like "This ticket" or "The user can now". Just state the change directly.
+Respond with one "=== ITEM n ===" header per item, each followed by its summary on the next line.
+{chr(10).join(sections)}"""
+    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={gemini_token}"
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    try:
+        response = SESSION.post(api_url, data=orjson.dumps(payload), headers=POST_JSON_HEADERS, timeout=60)
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        text = (((result.get('candidates') or [{}])[0].get('content') or {}).get('parts') or [{}])[0].get('text', '')
+        app.logger.info(f"Generated {len(pending)} summaries in one batched Gemini call.")
+    except requests.exceptions.RequestException as e:
+        app.logger.error(f"Error calling Gemini API for batch of {len(pending)} items: {e}")
+        text = ""
+
+    parts = ITEM_RE.split(text)
+    parsed = {int(num): body.strip() for num, body in zip(parts[1::2], parts[2::2])}
+    now = datetime.utcnow()
+    for n, (idx, cache_key) in enumerate(pending, 1):
+        summary = parsed.get(n)
+        if summary:
+            summaries[idx] = summary
+            db.ai_cache.update_one({'_id': cache_key},
+                                   {'$set': {'fetched_at': now, 'summary': summary}},
+                                   upsert=True)
+        else:
+            # Fall back to a single-item call rather than shipping a bare title.
+            title, description, is_upstream = items[idx]
+            summaries[idx] = get_summary_from_ai(title, description, gemini_token, is_upstream)
+    return summaries
+
 def process_upstream_bugs(bug_urls_raw, release_urls_raw, gemini_token):
     if not bug_urls_raw or not bug_urls_raw.strip():
         return ""
-    bug_urls = list(set(filter(None, re.split(r'[,\s\n]+', bug_urls_raw))))
+    bug_urls = list(set(filter(None, SPLIT_RE.split(bug_urls_raw))))
     if not bug_urls:
         return ""
     
     app.logger.info(f"Processing {len(bug_urls)} upstream bug URLs.")
-    summarized_bugs = []
-    for url in bug_urls:
+
+    def _scrape_one(url):
         try:
-            response = requests.get(url, timeout=10)
+            response = SESSION.get(url, timeout=10)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'lxml')
-            title_element = soup.find('div', id='summary-val')
-            description_element = soup.find('div', id='descriptionmodule')
-            if not title_element or not description_element:
+            # lxml's id lookup is a C-level hash walk, far cheaper than building
+            # a BeautifulSoup tree and traversing it from Python.
+            doc = lxml.html.fromstring(response.content)
+            title_element = doc.get_element_by_id('summary-val', None)
+            description_element = doc.get_element_by_id('descriptionmodule', None)
+            if title_element is None or description_element is None:
                 app.logger.warning(f"Could not find title or description elements on {url}")
-                continue
-            title = title_element.get_text(strip=True)
-            description = description_element.get_text(strip=True, separator='\n')
-            ticket_id = url.split('/')[-1]
-            summary = get_summary_from_ai(title, description, gemini_token, is_upstream=True)
-            summarized_bugs.append(f"* [{ticket_id}]({url}) - {summary}")
+                return None
+            title = title_element.text_content().strip()
+            description = description_element.text_content().strip()
+            return (url.split('/')[-1], url, title, description)
         except requests.exceptions.RequestException as e:
             app.logger.error(f"Could not scrape URL {url}: {e}")
-            continue
-    
+            return None
+
+    # The scrapes are independent blocking GETs, so overlap them just like the
+    # JIRA fetches in generate_release_notes.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        scraped = [bug for bug in executor.map(_scrape_one, bug_urls) if bug]
+    summaries = get_summaries_from_ai([(title, description, True) for _, _, title, description in scraped],
+                                      gemini_token)
+    summarized_bugs = [f"* [{ticket_id}]({url}) - {summary}"
+                       for (ticket_id, url, _, _), summary in zip(scraped, summaries)]
+
+
     if not summarized_bugs:
         return ""
-    md_lines = ["### Upstream Improvements", "The bug fixes, provided by MongoDB Community Edition and included in Percona Server for MongoDB, are the following:"]
-    md_lines.extend(summarized_bugs)
-    release_urls = list(set(filter(None, re.split(r'[,\s\n]+', release_urls_raw))))
+    # Assemble into a single contiguous buffer instead of growing a list of
+    # lines and joining it afterwards.
+    buf = io.StringIO()
+    write = buf.write
+    write("### Upstream Improvements\n")
+    write("The bug fixes, provided by MongoDB Community Edition and included in Percona Server for MongoDB, are the following:\n")
+    write("\n".join(summarized_bugs))
+    release_urls = list(set(filter(None, SPLIT_RE.split(release_urls_raw))))
     if release_urls:
-        md_lines.append("\nFind the full list of changes in the following MongoDB Community Edition release notes:")
+        write("\n\nFind the full list of changes in the following MongoDB Community Edition release notes:\n")
         release_links = []
         for r_url in sorted(release_urls):
-            match = re.search(r'(\d+\.\d+\.\d+)', r_url)
+            match = VERSION_RE.search(r_url)
             version = match.group(1) if match else "version"
             release_links.append(f"* [MongoDB {version} Community Edition]({r_url})")
-        md_lines.extend(release_links)
-    return "\n".join(md_lines)
+        write("\n".join(release_links))
+    return buf.getvalue()
 
 def generate_final_markdown(mongo_intro, release_highlights, upstream_section, tickets, version, codename, domain):
-    md_lines = []
-    if mongo_intro:
-        md_lines.extend([mongo_intro, "\n---"])
-    if release_highlights and release_highlights.strip():
-        md_lines.append("## Release Highlights")
-        md_lines.append("\nThis release provides the following features and improvements:\n")
-        md_lines.append(release_highlights)
-        md_lines.append("\n---")
-    if upstream_section:
-        md_lines.append(upstream_section)
-        md_lines.append("\n---")
-    title_line = f"# Release {version}" if version else "# Release Notes"
-    if codename: title_line += f' - "{codename}"'
-    md_lines.extend([title_line, f"*Released on: {datetime.now().strftime('%Y-%m-%d')}*", "---"])
-    categories = {"features": [], "fixes": [], "maintenance": []}
-    ISSUE_TYPE_MAP = {'Story': 'features', 'New Feature': 'features', 'Improvement': 'features', 'Epic': 'features', 'Bug': 'fixes', 'Defect': 'fixes', 'Task': 'maintenance', 'Sub-task': 'maintenance', 'Chore': 'maintenance', 'Technical Debt': 'maintenance'}
+    buckets = {"features": [], "fixes": [], "maintenance": []}
     for ticket in tickets:
         issue_type = ticket.get("fields", {}).get("issuetype", {}).get("name", "Task")
-        categories[ISSUE_TYPE_MAP.get(issue_type, "maintenance")].append(ticket)
-    section_map = {"features": "## ✨ New Features & Enhancements", "fixes": "## 🐛 Bug Fixes", "maintenance": "## 🔧 Technical & Maintenance"}
-    for category, title in section_map.items():
-        if categories[category]:
-            md_lines.append(title)
-            for ticket in categories[category]:
-                md_lines.append(f"- [{ticket['key']}](https://{domain}/browse/{ticket['key']}): {ticket['releaseNoteSummary']}")
-            md_lines.append("")
-    return "\n".join(md_lines)
+        buckets[ISSUE_TYPE_MAP.get(issue_type, "maintenance")].append(ticket)
+    sections = [(title, buckets[category]) for category, title in SECTION_ORDER if buckets[category]]
+    title_line = f"# Release {version}" if version else "# Release Notes"
+    if codename: title_line += f' - "{codename}"'
+    rendered = MARKDOWN_TEMPLATE.render(
+        mongo_intro=mongo_intro,
+        release_highlights=release_highlights if release_highlights and release_highlights.strip() else None,
+        upstream_section=upstream_section,
+        title_line=title_line,
+        release_date=datetime.now().strftime('%Y-%m-%d'),
+        sections=sections,
+        domain=domain)
+    # The template ends each block with a newline; drop the final one to match
+    # the output of the previous '\n'.join-based builder exactly.
+    return rendered.removesuffix('\n')
 
 # --- Main HTML Serving Route ---
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Local development entry point only. In the container the app runs under
+# gunicorn with gevent workers (see Dockerfile) so slow JIRA/Gemini calls
+# don't serialize all traffic the way the single-threaded dev server does.
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_ENV') == 'development')